@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Stream ingestion and level analysis in a child process"""
+# pylint: disable=W1203,W0718
+
+import math
+import time
+import logging
+import multiprocessing
+
+from multiprocessing import shared_memory
+
+import numpy
+import requests
+
+from streamtee import StreamTee, ArchiveWriter
+from latency import QUIET_CHUNKS
+
+LOG = logging.getLogger(__name__)
+
+RING_SIZE = 512
+READ_RETRIES = 10
+AUDIO_DB_THRESHOLD = 30
+HEADER = [
+    "seq",
+    "heartbeat",
+    "stream_online",
+    "last_audio_time",
+    "last_db",
+    "transitions",
+    "last_transition",
+    "ring_count",
+]
+FIELDS = {name: index for index, name in enumerate(HEADER)}
+
+
+def chunk_level(chunk):
+    """Level of a chunk in dB, or None if it is not sample data"""
+    try:
+        samps = numpy.frombuffer(chunk, dtype=numpy.int16)
+    except ValueError:
+        return None
+    rms = numpy.sqrt(numpy.mean(samps**2))
+    return 20*numpy.log10(rms)
+
+
+def is_audio(db):
+    """Check if a level counts as audio"""
+    return not math.isnan(db) and db < AUDIO_DB_THRESHOLD
+
+
+class SharedLevels:
+    """Analyzer state and a level ring buffer in shared memory
+
+    There is a single writer. Writes bump ``seq`` to an odd value, update the
+    fields and bump it back to even; readers retry until they see the same
+    even ``seq`` before and after copying, so no lock is shared between the
+    processes.
+    """
+
+    def __init__(self, name=None, create=False):
+        """init"""
+        size = (len(HEADER) + RING_SIZE) * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.array = numpy.ndarray(
+            (len(HEADER) + RING_SIZE,), dtype=numpy.float64, buffer=self.shm.buf)
+        if create:
+            self.array[:] = 0
+        self.header = self.array[:len(HEADER)]
+        self.ring = self.array[len(HEADER):]
+
+    @property
+    def name(self):
+        """Shared memory block name"""
+        return self.shm.name
+
+    def publish(self, db=None, **fields):
+        """Update header fields and append a level to the ring"""
+        self.header[FIELDS["seq"]] += 1
+        for field, value in fields.items():
+            self.header[FIELDS[field]] = value
+        if db is not None:
+            count = int(self.header[FIELDS["ring_count"]])
+            self.ring[count % RING_SIZE] = db
+            self.header[FIELDS["ring_count"]] = count + 1
+            self.header[FIELDS["last_db"]] = db
+        self.header[FIELDS["seq"]] += 1
+
+    def read(self):
+        """Consistent copy of the state, or None if the writer kept racing"""
+        for _ in range(READ_RETRIES):
+            seq = self.header[FIELDS["seq"]]
+            if seq % 2:
+                time.sleep(0)
+                continue
+            header = self.header.copy()
+            ring = self.ring.copy()
+            if self.header[FIELDS["seq"]] != seq:
+                continue
+            state = {name: float(header[index]) for name, index in FIELDS.items()}
+            count = int(state["ring_count"])
+            if count > RING_SIZE:
+                ring = numpy.roll(ring, -(count % RING_SIZE))
+            else:
+                ring = ring[:count]
+            state["levels"] = ring.tolist()
+            return state
+        return None
+
+    def close(self, unlink=False):
+        """Detach from the block"""
+        self.header = self.ring = self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class LevelPublisher:
+    """Stream consumer that publishes levels to shared memory"""
+
+    def __init__(self, shared):
+        """init"""
+        self.shared = shared
+        self.last_audio_time = time.time()
+        self.armed = True
+        self.quiet_chunks = 0
+        self.quiet_since = 0
+        self.transitions = 0
+        self.last_transition = 0
+
+    def __call__(self, chunk):
+        """Analyze one chunk"""
+        now = time.time()
+        db = chunk_level(chunk)
+        if db is None:
+            self.disconnected()
+            return
+        if is_audio(db):
+            self.last_audio_time = now
+            self.armed = True
+            self.quiet_chunks = 0
+        else:
+            if not self.quiet_chunks:
+                self.quiet_since = now
+            self.quiet_chunks += 1
+            if self.armed and self.quiet_chunks >= QUIET_CHUNKS:
+                self.armed = False
+                self.transitions += 1
+                self.last_transition = self.quiet_since
+        self.shared.publish(
+            db=db,
+            heartbeat=now,
+            stream_online=1,
+            last_audio_time=self.last_audio_time,
+            transitions=self.transitions,
+            last_transition=self.last_transition,
+        )
+
+    def disconnected(self):
+        """Mark the stream offline"""
+        self.shared.publish(heartbeat=time.time(), stream_online=0)
+
+
+def run_analyzer(shm_name, stream_url, archive_dir=None):
+    """Child process entry point"""
+    logging.basicConfig(level=logging.INFO)
+    shared = SharedLevels(name=shm_name)
+    publisher = LevelPublisher(shared)
+    shared.publish(heartbeat=time.time(), last_audio_time=publisher.last_audio_time)
+
+    def get_stream():
+        return requests.get(stream_url, stream=True, timeout=15)
+
+    tee = StreamTee(get_stream, on_disconnect=publisher.disconnected)
+    tee.add_consumer("analyzer", publisher)
+    if archive_dir:
+        tee.add_consumer("archive", ArchiveWriter(archive_dir), maxsize=1024)
+    tee.run()
+
+
+def start_analyzer(shared, stream_url, archive_dir=None):
+    """Start the analyzer in a fresh interpreter"""
+    context = multiprocessing.get_context("spawn")
+    process = context.Process(
+        target=run_analyzer, name="stream-analyzer",
+        args=(shared.name, stream_url, archive_dir), daemon=True)
+    process.start()
+    LOG.info(f"Started stream analyzer process {process.pid}")
+    return process
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Run playback commands in order on a dedicated worker"""
+# pylint: disable=W1203,W0718
+
+import time
+import queue
+import logging
+import threading
+
+from collections import deque
+
+LOG = logging.getLogger(__name__)
+
+COALESCE_WINDOW = 0.75
+HISTORY_SIZE = 50
+
+
+class CommandDispatcher:
+    """Acknowledge commands immediately and run them on one worker thread
+
+    A command submitted again within COALESCE_WINDOW seconds of the same
+    command is dropped, so a double tap on the Stream Deck only runs once.
+    """
+
+    def __init__(self, window=COALESCE_WINDOW):
+        """init"""
+        self.window = window
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.last_submitted = {}
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.next_id = 0
+
+    def submit(self, name, func):
+        """Queue a command, returning the command record"""
+        now = time.time()
+        with self.lock:
+            last = self.last_submitted.get(name)
+            if last and now - last["submitted"] < self.window:
+                LOG.debug("Coalescing repeated %s command", name)
+                last["coalesced"] += 1
+                return last
+            self.next_id += 1
+            command = {
+                "id": self.next_id,
+                "name": name,
+                "status": "queued",
+                "submitted": now,
+                "coalesced": 0,
+                "latency_ms": None,
+                "error": None,
+            }
+            self.last_submitted[name] = command
+            self.history.append(command)
+        self.queue.put((command, func))
+        return command
+
+    def run(self):
+        """Execute queued commands in order"""
+        while True:
+            command, func = self.queue.get()
+            command["status"] = "running"
+            try:
+                func()
+                command["status"] = "done"
+            except Exception as exc:
+                command["status"] = "failed"
+                command["error"] = str(exc)
+                LOG.error("Command %s failed", command["name"])
+                LOG.debug("Command %s traceback", command["name"], exc_info=True)
+            command["latency_ms"] = int((time.time() - command["submitted"]) * 1000)
+            LOG.debug("Command %s %s in %dms", command["name"], command["status"],
+                      command["latency_ms"])
+
+    def status(self):
+        """Recent commands and completion latency"""
+        with self.lock:
+            history = [dict(command) for command in self.history]
+        latencies = [command["latency_ms"] for command in history
+                     if command["latency_ms"] is not None]
+        return {
+            "pending": self.queue.qsize(),
+            "last_latency_ms": latencies[-1] if latencies else None,
+            "max_latency_ms": max(latencies) if latencies else None,
+            "recent": history[-10:],
+        }
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Circuit breakers for calls to Plex and the Plex client"""
+# pylint: disable=W1203
+
+import time
+import random
+import logging
+import threading
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+BASE_BACKOFF = 1.0
+MAX_BACKOFF = 60.0
+
+
+class CircuitBreaker:
+    """Track consecutive failures and back off while a service is down
+
+    After a failure the breaker opens and callers skip their calls until an
+    exponentially growing, jittered backoff has passed. The next allowed call
+    is a half-open probe: success closes the breaker, failure reopens it with
+    a longer backoff. Only the first failure logs a full traceback.
+    """
+
+    def __init__(self, name, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        """init"""
+        self.name = name
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.next_attempt = 0
+        self.last_error = ""
+
+    def allow(self):
+        """Check if a call should be attempted now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                return False
+            if time.time() < self.next_attempt:
+                return False
+            self.state = HALF_OPEN
+            LOG.info(f"{self.name}: probing after {self.failures} failures")
+            return True
+
+    def success(self):
+        """Record a successful call"""
+        with self.lock:
+            if self.state != CLOSED:
+                LOG.info(f"{self.name}: recovered after {self.failures} failures")
+            self.state = CLOSED
+            self.failures = 0
+            self.last_error = ""
+
+    def failure(self, exc=None):
+        """Record a failed call and schedule the next attempt"""
+        with self.lock:
+            self.failures += 1
+            self.last_error = repr(exc) if exc else ""
+            # cap the exponent so long outages can't overflow the float
+            backoff = min(self.max_backoff,
+                          self.base_backoff * 2 ** min(self.failures - 1, 16))
+            backoff *= random.uniform(0.5, 1.0)
+            self.next_attempt = time.time() + backoff
+            self.state = OPEN
+            if self.failures == 1:
+                LOG.error("%s: call failed, backing off: %s", self.name, self.last_error)
+                LOG.debug("%s: failure traceback", self.name, exc_info=True)
+            else:
+                LOG.debug("%s: failure %d, retrying in %.1fs: %s",
+                          self.name, self.failures, backoff, self.last_error)
+
+    @property
+    def degraded(self):
+        """True while the breaker is not closed"""
+        return self.state != CLOSED
+
+    def status(self):
+        """Status for the snapshot"""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
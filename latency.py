@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Estimate the delay between the Plex player and the on-air stream"""
+# pylint: disable=W1203
+
+import time
+import logging
+import statistics
+import threading
+
+from collections import deque
+
+LOG = logging.getLogger(__name__)
+
+MIN_LATENCY = 0.5
+MAX_LATENCY = 30.0
+SAMPLE_WINDOW = 20
+TRANSITION_DEBOUNCE = 2.0
+QUIET_CHUNKS = 4
+
+
+class LatencyEstimator:
+    """Match player events to stream level transitions
+
+    The player reports track changes and silence-track starts as they happen
+    on the Plex client. The stream analyzer reports when the stream drops from
+    audio to quiet for at least QUIET_CHUNKS chunks in a row. Each stream
+    transition is paired with the most recent
+    unmatched player event that happened between MIN_LATENCY and MAX_LATENCY
+    seconds earlier, and the gap is kept as a delay sample.
+    """
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        """init"""
+        self.lock = threading.Lock()
+        self.player_events = deque(maxlen=window)
+        self.samples = deque(maxlen=window)
+        self.last_transition = 0
+        self.armed = True
+        self.quiet_chunks = 0
+        self.quiet_since = 0
+
+    def player_event(self, kind, event_time=None):
+        """Record a track transition or silence-track start on the player"""
+        event_time = event_time or time.time()
+        with self.lock:
+            self.player_events.append({"kind": kind, "time": event_time})
+
+    def stream_level(self, is_audio, event_time=None):
+        """Feed the analyzer's audio/quiet decision for each chunk"""
+        event_time = event_time or time.time()
+        with self.lock:
+            if is_audio:
+                self.armed = True
+                self.quiet_chunks = 0
+                return
+            if not self.quiet_chunks:
+                self.quiet_since = event_time
+            self.quiet_chunks += 1
+            went_quiet = self.armed and self.quiet_chunks >= QUIET_CHUNKS
+            if went_quiet:
+                self.armed = False
+        if went_quiet:
+            self.stream_transition(self.quiet_since)
+
+    def stream_transition(self, event_time):
+        """Record an audio to quiet transition on the stream"""
+        with self.lock:
+            if event_time - self.last_transition < TRANSITION_DEBOUNCE:
+                return
+            self.last_transition = event_time
+            self.match(event_time)
+
+    def match(self, stream_time):
+        """Pair a stream transition with a player event, caller holds lock"""
+        for event in reversed(self.player_events):
+            delay = stream_time - event["time"]
+            if delay < MIN_LATENCY:
+                continue
+            if delay > MAX_LATENCY:
+                break
+            self.player_events.remove(event)
+            self.samples.append(delay)
+            LOG.debug("Stream latency sample %.2fs from %s", delay, event["kind"])
+            return
+
+    def estimate(self):
+        """Return the rolling delay estimate and a 0-1 confidence"""
+        with self.lock:
+            samples = list(self.samples)
+        if not samples:
+            return {"latency": 0, "confidence": 0, "samples": 0}
+        latency = statistics.median(samples)
+        spread = statistics.median(abs(sample - latency) for sample in samples)
+        confidence = min(1.0, len(samples) / self.samples.maxlen) / (1 + spread)
+        return {
+            "latency": round(latency, 2),
+            "confidence": round(confidence, 2),
+            "samples": len(samples),
+        }
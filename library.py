@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""In-memory index of the music library for fast lookups"""
+# pylint: disable=W1203
+
+import re
+import time
+import logging
+import threading
+import unicodedata
+
+from datetime import datetime
+
+LOG = logging.getLogger(__name__)
+
+SEARCH_LIMIT = 25
+
+
+def normalize(text):
+    """Lowercase, strip accents and split text into word tokens"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r"\w+", text.lower())
+
+
+class LibraryIndex:
+    """Index tracks by guid and by title/artist/album tokens"""
+
+    def __init__(self):
+        """init"""
+        self.lock = threading.Lock()
+        self.section = None
+        self.tracks = {}
+        self.entries = {}
+        self.tokens = {}
+        self.refreshed_at = None
+        self.built_at = 0
+
+    def build(self, section):
+        """Index every track in the section"""
+        start = time.time()
+        self.section = section
+        refreshed_at = datetime.now()
+        tracks = section.searchTracks()
+        with self.lock:
+            self.tracks = {}
+            self.entries = {}
+            self.tokens = {}
+            for track in tracks:
+                self.add(track)
+        self.refreshed_at = refreshed_at
+        self.built_at = time.time()
+        LOG.info(f"Indexed {len(self.tracks)} tracks in {time.time() - start:.2f}s")
+
+    def refresh(self):
+        """Index tracks added or updated since the last build or refresh
+
+        Deleted tracks are not seen here; they stay in the index until the
+        next full build.
+        """
+        if not self.section:
+            return
+        refreshed_at = datetime.now()
+        tracks = self.section.searchTracks(
+            filters={"updatedAt>>": self.refreshed_at})
+        tracks += self.section.searchTracks(
+            filters={"addedAt>>": self.refreshed_at})
+        with self.lock:
+            for track in tracks:
+                self.add(track)
+        self.refreshed_at = refreshed_at
+        if tracks:
+            LOG.info(f"Refreshed {len(tracks)} tracks in library index")
+
+    def add(self, track):
+        """Add or replace a track, caller holds lock"""
+        if track.guid in self.entries:
+            self.remove(track.guid)
+        entry = {
+            "guid": track.guid,
+            "ratingKey": track.ratingKey,
+            "title": track.title,
+            "artist": track.grandparentTitle,
+            "album": track.parentTitle,
+            "duration": track.duration,
+        }
+        self.tracks[track.guid] = track
+        self.entries[track.guid] = entry
+        for token in self.entry_tokens(entry):
+            self.tokens.setdefault(token, set()).add(track.guid)
+
+    def remove(self, guid):
+        """Drop a track from the token index, caller holds lock"""
+        for token in self.entry_tokens(self.entries.pop(guid)):
+            guids = self.tokens.get(token)
+            if guids:
+                guids.discard(guid)
+                if not guids:
+                    del self.tokens[token]
+        self.tracks.pop(guid, None)
+
+    def entry_tokens(self, entry):
+        """All search tokens for an entry"""
+        return set(normalize(entry["title"]) + normalize(entry["artist"]) +
+                   normalize(entry["album"]))
+
+    def track(self, guid):
+        """Look up a track object by guid"""
+        return self.tracks.get(guid)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Find tracks matching every query token, the last one as a prefix"""
+        query_tokens = normalize(query)
+        if not query_tokens:
+            return []
+        with self.lock:
+            matches = None
+            for token in query_tokens[:-1]:
+                guids = self.tokens.get(token, set())
+                matches = guids if matches is None else matches & guids
+            prefix = query_tokens[-1]
+            prefix_matches = set()
+            for token, guids in self.tokens.items():
+                if token.startswith(prefix):
+                    prefix_matches |= guids
+            matches = prefix_matches if matches is None else matches & prefix_matches
+            results = [self.entries[guid] for guid in matches]
+        results.sort(key=lambda entry: (entry["artist"] or "", entry["title"] or ""))
+        return results[:limit]
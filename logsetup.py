@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Logging setup with an optional queue-based JSON lines mode"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+import logging.handlers
+
+LOG_MODE = os.getenv("LOG_MODE", "")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_FILE = os.getenv("LOG_FILE", "./radioblue.log.jsonl")
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+DEDUP_WINDOW = 60
+MIC_LOG_FILE = "./debug.txt"
+MIC_LOGGER = "radioblue.mic"
+
+
+class DedupFilter(logging.Filter):
+    """Drop warnings and errors identical to one logged within the window
+
+    Records are identical when the logger, level, message, arguments and
+    any exception type and text match. The first copy logged after the
+    window carries a ``suppressed`` count of how many were dropped. Lower
+    levels and the mic audit log always pass.
+    """
+
+    def __init__(self, window=DEDUP_WINDOW):
+        """init"""
+        super().__init__()
+        self.window = window
+        self.lock = threading.Lock()
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING or record.name == MIC_LOGGER:
+            return True
+        exc = ""
+        if record.exc_info and record.exc_info[0]:
+            exc = f"{record.exc_info[0].__name__}: {record.exc_info[1]}"
+        key = (record.name, record.levelno, str(record.msg), repr(record.args), exc)
+        now = time.time()
+        with self.lock:
+            last_time, suppressed = self.seen.get(key, (0, 0))
+            if now - last_time < self.window:
+                self.seen[key] = (last_time, suppressed + 1)
+                return False
+            self.seen[key] = (now, 0)
+            if len(self.seen) > 1000:
+                self.seen = {seen_key: value for seen_key, value in self.seen.items()
+                             if now - value[0] < self.window}
+        record.suppressed = suppressed
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are, leaving formatting to the listener
+
+    The stock QueueHandler formats the message and traceback on the calling
+    thread so records can be pickled; this queue never leaves the process.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record):
+        data = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        if getattr(record, "suppressed", 0):
+            data["suppressed"] = record.suppressed
+        return json.dumps(data)
+
+
+def setup_logging():
+    """Configure the root logger
+
+    By default log synchronously to stderr. With LOG_MODE=async, log calls
+    only filter and enqueue the record; a background listener thread formats
+    it and writes JSON lines to a rotating LOG_FILE. Mic events always log
+    at INFO to MIC_LOG_FILE, whatever LOG_LEVEL is.
+    """
+    if multiprocessing.parent_process():
+        # spawned children re-import the main module and log on their own
+        return None
+    mic_handler = logging.FileHandler(MIC_LOG_FILE, encoding="utf-8", delay=True)
+    mic_handler.setFormatter(logging.Formatter("%(created)f - %(message)s"))
+    logging.getLogger(MIC_LOGGER).setLevel(logging.INFO)
+
+    if LOG_MODE != "async":
+        logging.basicConfig(level=logging.DEBUG)
+        logging.getLogger(MIC_LOGGER).addHandler(mic_handler)
+        return None
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    mic_handler.addFilter(logging.Filter(MIC_LOGGER))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(DedupFilter())
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, mic_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -13,12 +13,12 @@ import subprocess
 import traceback
 import shutil
 import math
-import numpy
+import atexit
 import requests
 import pprint
 
 from datetime import datetime
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 
 from InquirerPy import inquirer
 from InquirerPy.base import Choice
@@ -27,11 +27,20 @@ from plexapi.server import PlexServer
 from plexapi.playqueue import PlayQueue
 from plexapi.myplex import MyPlexAccount
 
+from logsetup import setup_logging, LOG_LEVEL
+from streamtee import StreamTee, ArchiveWriter
+from latency import LatencyEstimator
+from analyzer_process import SharedLevels, chunk_level, is_audio, start_analyzer
+from library import LibraryIndex
+from health import CircuitBreaker
+from commands import CommandDispatcher
+
 app = Flask(__name__)
 
 LOG = logging.getLogger(__name__)
-logging.basicConfig(level=logging.DEBUG)
-logging.getLogger("__main__").setLevel(logging.DEBUG)
+MIC_LOG = logging.getLogger("radioblue.mic")
+setup_logging()
+logging.getLogger("__main__").setLevel(LOG_LEVEL)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 logging.getLogger("charset_normalizer").setLevel(logging.WARNING)
 logging.getLogger("asyncio").setLevel(logging.WARNING)
@@ -46,8 +55,20 @@ CLIENT_NAME = os.getenv("CLIENT_NAME", "MyPlexamp")
 LIBRARY_SECTION = os.getenv("LIBRARY_SECTION", "Music")
 TIDBYT_SERVER = "http://192.168.1.120:5123"
 CONFIG_FILE = "config.json"
+STATE_FILE = "state.json"
+CHECKPOINT_INTERVAL = 5
+STATE_MAX_AGE = 6 * 60 * 60
 ENABLE_ARTWORK = False
 ITEMS_BEFORE_SILENCE = 6
+ENABLE_ARCHIVE = os.getenv("ENABLE_ARCHIVE", "0") == "1"
+ARCHIVE_DIR = "./archive"
+APPLY_STREAM_LATENCY = os.getenv("APPLY_STREAM_LATENCY", "0") == "1"
+MIN_LATENCY_CONFIDENCE = 0.5
+LIBRARY_REFRESH_INTERVAL = 300
+LIBRARY_REBUILD_INTERVAL = 3600
+STALE_AFTER = 5
+ANALYZER_PROCESS = os.getenv("ANALYZER_PROCESS", "0") == "1"
+ANALYZER_STALE_AFTER = 30
 NOW_PLAYING = """
 Title: {title}
 Artist: {artist_name} 
@@ -79,15 +100,104 @@ class RadioBlueQueue:
         self.paused = False
         self.time_since_stream_audio = 0
         self.stream_online = False
+        self.last_audio_time = time.time()
+        self.stream_tee = None
+        self.stream_levels = []
+        self.session_seen = False
+        self.latency = LatencyEstimator()
+        self.library = LibraryIndex()
+        self.health = {
+            "plex": CircuitBreaker("plex"),
+            "client": CircuitBreaker("client"),
+        }
+        self.snapshot = {}
+        self.snapshot_time = 0
+        self.commands = CommandDispatcher()
+        # held while the sync loop or a command changes the play queue
+        self.play_queue_lock = threading.RLock()
         self.server_play_queue = None
         self.track_log = f'./track_log_{time.time()}.txt'
+        self.started_at = None
+        self.resumed = False
+        self.last_checkpoint = 0
 
     def setup(self):
         self.options = self.get_all_options()
+        # measure restart time from after the interactive prompts
+        self.started_at = time.time()
         self.playlists = self.load_playlists()
-        self.play_queue = self.init_play_queue()
+        self.play_queue = self.resume_play_queue() or self.init_play_queue()
         self.client = self.get_client()
 
+    def save_state(self):
+        """Atomically checkpoint queue state to disk"""
+        state = {
+            "play_queue_id": self.play_queue.playQueueID,
+            "on_air_playlist": self.options.get("on_air_playlist"),
+            "queued_songs": list(self.queued_songs),
+            "used_silence_positions": self.used_silence_positions,
+            "currently_playing": self.currently_playing,
+            "playing_next": self.playing_next,
+            "track_log": self.track_log,
+            "saved_at": time.time(),
+        }
+        tmp_file = f"{STATE_FILE}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as state_fh:
+            state_fh.write(json.dumps(state))
+            state_fh.flush()
+            os.fsync(state_fh.fileno())
+        os.replace(tmp_file, STATE_FILE)
+        self.last_checkpoint = time.time()
+
+    def checkpoint(self):
+        """Save state if the checkpoint interval has elapsed"""
+        if time.time() - self.last_checkpoint < CHECKPOINT_INTERVAL:
+            return
+        try:
+            self.save_state()
+        except Exception:
+            LOG.error("Failed to checkpoint state")
+            LOG.debug(traceback.format_exc())
+
+    def load_state(self):
+        """Load the last checkpoint"""
+        if not os.path.exists(STATE_FILE):
+            return {}
+        with open(STATE_FILE, "r", encoding="utf-8") as state_fh:
+            try:
+                return json.loads(state_fh.read())
+            except json.decoder.JSONDecodeError:
+                LOG.error(f"Ignoring corrupt state file: {STATE_FILE}")
+                return {}
+
+    def resume_play_queue(self):
+        """Reattach to the play queue from the last checkpoint"""
+        state = self.load_state()
+        if not state.get("play_queue_id"):
+            return None
+        if state.get("on_air_playlist") != self.options.get("on_air_playlist"):
+            LOG.info("On-air playlist changed since last checkpoint, starting fresh")
+            return None
+        age = time.time() - state.get("saved_at", 0)
+        if age > STATE_MAX_AGE:
+            LOG.info(f"Checkpoint is {int(age)}s old, starting fresh")
+            return None
+        try:
+            play_queue = PlayQueue.get(self.server, state["play_queue_id"])
+        except Exception:
+            LOG.info(f"Play queue {state['play_queue_id']} is gone, starting fresh")
+            LOG.debug(traceback.format_exc())
+            return None
+        self.queued_songs = dict.fromkeys(state.get("queued_songs", []), True)
+        self.used_silence_positions = state.get("used_silence_positions", [])
+        self.currently_playing = state.get("currently_playing", {})
+        self.playing_next = state.get("playing_next", {})
+        self.track_log = state.get("track_log", self.track_log)
+        self.resumed = True
+        LOG.info(f"Resumed play queue {play_queue.playQueueID} with "
+                 f"{len(self.queued_songs)} queued songs")
+        return play_queue
+
     def connect_client(self):
         """Get client"""
         self.client = self.get_client()
@@ -105,18 +215,36 @@ class RadioBlueQueue:
         return output
 
     def init_play_queue(self):
-        music_section = self.server.library.section(LIBRARY_SECTION)
         items = []
-        if self.options.get("silence_track"):
-            for track in music_section.searchTracks(
-                guid=self.options.get("silence_track")
-            ):
-                items.append(track)
+        silence_track = self.find_track(self.options.get("silence_track"))
+        if silence_track:
+            items.append(silence_track)
         return PlayQueue.create(self.server, items)
 
+    def find_track(self, guid):
+        """Find a track by guid, preferring the library index"""
+        if not guid:
+            return None
+        track = self.library.track(guid)
+        if track:
+            return track
+        music_section = self.server.library.section(LIBRARY_SECTION)
+        for track in music_section.searchTracks(guid=guid):
+            return track
+        return None
+
     def play(self):
         self.client.playMedia(self.play_queue)
 
+    def is_playing(self):
+        """Check if the client is already playing our play queue"""
+        for timeline in self.client.timelines():
+            if timeline.state not in ("playing", "paused"):
+                continue
+            if timeline.playQueueID == self.play_queue.playQueueID:
+                return True
+        return False
+
     def get_all_options(self):
         """Fetch all options via inquirer or cfg"""
         prev_options = {}
@@ -301,7 +429,7 @@ class RadioBlueQueue:
             ):
                 continue
 
-            LOG.debug(f"Adding {song.title} to queue")
+            LOG.debug("Adding %s to queue", song.title)
             if song.guid == self.options.get("silence_track"):
                 # LOG.debug(f"Marking silence position {play_pos} as used")
                 self.used_silence_positions.append(play_pos)
@@ -321,7 +449,7 @@ class RadioBlueQueue:
                     self.play_queue.addItem(song)
             except Exception:
                 LOG.error("Failed to add item to play queue")
-                LOG.debug(traceback.format_exc())
+                LOG.debug("Add item traceback", exc_info=True)
         self.refresh_play_queue()
 
     def get_artwork(self, suffix):
@@ -336,6 +464,9 @@ class RadioBlueQueue:
         for session in self.server.sessions():
             if session.player.title != self.options["client_name"]:
                 continue
+            # the first session seen after start or resume is not a transition
+            first_session = not self.session_seen
+            self.session_seen = True
             if self.currently_playing.get("title") == session.title:
                 continue
             ms = session.duration
@@ -350,18 +481,30 @@ class RadioBlueQueue:
                     LOG.error("Failed to fetch artwork")
 
             self.currently_playing = {"title": session.title, "guid": session.guid}
-            LOG.debug(f"Now playing: {session.title}")
+            LOG.debug("Now playing: %s", session.title)
+            if not first_session:
+                if session.guid == self.options.get("silence_track"):
+                    self.latency.player_event("silence")
+                else:
+                    self.latency.player_event("track")
 
             # auto on-mic
             if session.guid == self.options.get("silence_track"):
                 LOG.debug("Enabling mic due to silence track")
-                mic_on()
+                try:
+                    mic_on()
+                except OSError:
+                    LOG.error("Failed to enable mic", exc_info=True)
             album = session.album() 
-            with open(self.track_log, 'a', encoding='utf-8') as track_log_fh:
-                track_string = f'{session.title} by {session.grandparentTitle} ' \
-                               f'({album.year})'
-                track_log_fh.write(track_string + "\n")
-            LOG.debug(f"Adding {track_string} to {self.track_log}")
+            year = album.year if album else ""
+            track_string = f'{session.title} by {session.grandparentTitle} ({year})'
+            # local failures here must not trip the plex breaker
+            try:
+                with open(self.track_log, 'a', encoding='utf-8') as track_log_fh:
+                    track_log_fh.write(track_string + "\n")
+                LOG.debug("Adding %s to %s", track_string, self.track_log)
+            except OSError:
+                LOG.error("Failed to write track log", exc_info=True)
             
             ps_key = session.guid
             self.played_songs[ps_key] = True
@@ -387,8 +530,11 @@ class RadioBlueQueue:
                 artwork_data=artwork_data,
                 length=duration,
             )
-            with open("./Now Playing.txt", "w", encoding="utf-8") as out_fh:
-                out_fh.write(now_playing_txt)
+            try:
+                with open("./Now Playing.txt", "w", encoding="utf-8") as out_fh:
+                    out_fh.write(now_playing_txt)
+            except OSError:
+                LOG.error("Failed to write Now Playing.txt", exc_info=True)
 
     def update_stats(self):
         """Update time remaining"""
@@ -437,8 +583,12 @@ class RadioBlueQueue:
         ):
             on_mic = "next"
 
+        timelines = self.client.timelines()
+        state = self.player_state(timelines)
+        if state:
+            self.paused = state == "paused"
         mediatype = None
-        for mediatype in self.client.timelines():
+        for mediatype in timelines:
             if not mediatype.time:
                 continue
             if not mediatype.duration:
@@ -456,10 +606,21 @@ class RadioBlueQueue:
             time_til_silence += mediatype.duration
             time_til_silence -= mediatype.time
 
+        latency = self.latency.estimate()
+        latency_applied = APPLY_STREAM_LATENCY and \
+            latency["confidence"] >= MIN_LATENCY_CONFIDENCE
+        if latency_applied:
+            # listeners hear everything latency seconds after the player does
+            track_time_left += latency["latency"] * 1000
+            if time_til_silence:
+                time_til_silence += latency["latency"] * 1000
+
         seconds = int((int(track_time_left) / 1000) % 60)
         minutes = int((int(track_time_left) / (1000 * 60)) % 60)
         hours = (int(track_time_left) / (1000 * 60 * 60)) % 24
-        percent = int((mediatype.time / mediatype.duration) * 100)
+        # from the time left so it matches the countdown, latency included
+        percent = max(0, int(
+            ((mediatype.duration - track_time_left) / mediatype.duration) * 100))
 
         total_duration += track_time_left
         td_seconds = int((total_duration / 1000) % 60)
@@ -522,10 +683,27 @@ class RadioBlueQueue:
             "mic_color": mic_color,
             "stream_online": self.stream_online,
             "time_since_stream_audio": self.time_since_stream_audio,
+            "stream_latency": latency["latency"],
+            "stream_latency_confidence": latency["confidence"],
+            "stream_latency_applied": latency_applied,
         }
+        self.snapshot = timeleft_data
+        self.snapshot_time = time.time()
         with open("./timeleft.json", "w", encoding="utf-8") as tl_fh:
             tl_fh.write(json.dumps(timeleft_data))
 
+    def health_status(self):
+        """Summarize Plex and client health"""
+        degraded = any(breaker.degraded for breaker in self.health.values())
+        # the snapshot comes from update_stats, which only uses the client
+        stale = self.health["client"].degraded or \
+            time.time() - self.snapshot_time > STALE_AFTER
+        return {
+            "degraded": degraded,
+            "stale": stale,
+            "health": {name: breaker.status() for name, breaker in self.health.items()},
+        }
+
     def tidbyt(self, starlet_file="onair"):
         """Render and push a tidbyt image"""
         with open(f"{starlet_file}.star", "rb") as fileh:
@@ -551,8 +729,18 @@ class RadioBlueQueue:
         """Skip client to next track"""
         self.client.skipNext()
 
+    def player_state(self, timelines=None):
+        """Player state from the music timeline"""
+        if timelines is None:
+            timelines = self.client.timelines()
+        for timeline in timelines:
+            if timeline.type == "music" and timeline.state:
+                return timeline.state
+        return None
+
     def pause(self):
-        """Pause"""
+        """Toggle pause based on the real player state"""
+        self.paused = self.player_state() == "paused"
         if self.paused:
             self.client.play()
             self.paused = False
@@ -566,27 +754,62 @@ class RadioBlueQueue:
 
     def delete_last(self):
         """Play"""
-        last_item = self.play_queue.items[-1]
-        self.play_queue.removeItem(last_item)
-        self.refresh_play_queue()
+        with self.play_queue_lock:
+            last_item = self.play_queue.items[-1]
+            self.play_queue.removeItem(last_item)
+            self.refresh_play_queue()
 
     def add_silence(self):
         """Add silence to the queue"""
-        music_section = self.server.library.section("Music")
         if self.options.get("silence_track"):
-            for track in music_section.searchTracks(
-                guid=self.options.get("silence_track")
-            ):
-                try:
-                    self.play_queue.addItem(track)
-                except Exception:
-                    pass
-            self.refresh_play_queue()
+            track = self.find_track(self.options.get("silence_track"))
+            with self.play_queue_lock:
+                if track:
+                    try:
+                        self.play_queue.addItem(track)
+                    except Exception:
+                        pass
+                self.refresh_play_queue()
+
+    def queue_track(self, guid):
+        """Append a library track to the play queue"""
+        track = self.library.track(guid)
+        if not track:
+            return False
+        try:
+            with self.play_queue_lock:
+                self.play_queue.addItem(track)
+                self.queued_songs[guid] = True
+                self.refresh_play_queue()
+        except Exception:
+            LOG.error("Failed to add item to play queue")
+            LOG.debug("Add item traceback", exc_info=True)
+            return False
+        LOG.info(f"Queued {track.title} from library search")
+        return True
 
     def get_stream(self):
         """Fetch the mp3 stream"""
         stream_url = self.options.get('stream_url', '')
-        return requests.get(stream_url, stream=True)
+        return requests.get(stream_url, stream=True, timeout=15)
+
+    def analyze_stream_chunk(self, chunk):
+        """Track time since the stream last carried audio"""
+        db = chunk_level(chunk)
+        if db is None:
+            self.stream_online = False
+            return
+        self.stream_online = True
+        audio = is_audio(db)
+        if audio:
+            self.last_audio_time = time.time()
+        self.latency.stream_level(audio)
+        diff_time = time.time() - self.last_audio_time
+        self.time_since_stream_audio = int(diff_time)
+
+    def stream_disconnected(self):
+        """Mark the stream offline"""
+        self.stream_online = False
 
 
 def web(rbq):
@@ -597,40 +820,58 @@ def web(rbq):
 
 @app.route("/")
 def timeleft():
-    with open("./timeleft.json", "r", encoding="utf-8") as tl_fh:
-        try:
-            data = json.loads(tl_fh.read())
-        except json.decoder.JSONDecodeError:
-            data = {}
+    rbq = app.config["rbq"]
+    if rbq.snapshot:
+        data = dict(rbq.snapshot)
+    else:
+        with open("./timeleft.json", "r", encoding="utf-8") as tl_fh:
+            try:
+                data = json.loads(tl_fh.read())
+            except json.decoder.JSONDecodeError:
+                data = {}
+    data.update(rbq.health_status())
+    data["paused"] = rbq.paused
+    data["commands_pending"] = rbq.commands.queue.qsize()
     return jsonify(data)
 
 
+@app.route("/commands")
+def commands():
+    """Recent command status and latency"""
+    return jsonify(app.config["rbq"].commands.status())
+
+
+def next_track_mic_off():
+    """Skip to the next track and turn the mic off"""
+    app.config["rbq"].next_track()
+    mic_off()
+
+
 @app.route("/next")
 def next_track():
     """hello"""
-    app.config["rbq"].next_track()
-    mic_off()
+    app.config["rbq"].commands.submit("next", next_track_mic_off)
     return "next track"
 
 
 @app.route("/pause")
 def pause():
     """hello"""
-    app.config["rbq"].pause()
+    app.config["rbq"].commands.submit("pause", app.config["rbq"].pause)
     return "pause"
 
 
 @app.route("/unpause")
 def unpause():
     """hello"""
-    app.config["rbq"].unpause()
+    app.config["rbq"].commands.submit("unpause", app.config["rbq"].unpause)
     return "unpause"
 
 
 @app.route("/delete_last")
 def delete_last():
     """hello"""
-    app.config["rbq"].delete_last()
+    app.config["rbq"].commands.submit("delete_last", app.config["rbq"].delete_last)
     return "delete"
 
 
@@ -642,15 +883,13 @@ def mic_off():
         diff_time = time.time() - app.config.get("last_mute")
  
     if diff_time and diff_time < 2:
-        with open('./debug.txt', 'a') as dw:
-            dw.write(f"{time.time()} - debouncing mic off: {diff_time}\n")
+        MIC_LOG.info("debouncing mic off: %s", diff_time)
         return "ok"
 
     app.config["last_mute"] = time.time()
     subprocess.run(['./mute.sh'])
     subprocess.run(['./offmic.sh'])
-    with open('./debug.txt', 'a') as dw:
-        dw.write(f"{time.time()} - mic off\n")
+    MIC_LOG.info("mic off")
     return "mic off"
 
 
@@ -662,24 +901,21 @@ def mic_on():
         diff_time = time.time() - app.config.get("last_unmute")
  
     if diff_time and diff_time < 2:
-        with open('./debug.txt', 'a') as dw:
-            dw.write(f"{time.time()} - debouncing mic on: {diff_time}\n")
+        MIC_LOG.info("debouncing mic on: %s", diff_time)
         return "ok"
 
     app.config["last_unmute"] = time.time()
  
     subprocess.run(['./unmute.sh'])
     subprocess.run(['./onmic.sh'])
-    with open('./debug.txt', 'a') as dw:
-        dw.write(f"{time.time()} - mic on\n")
+    MIC_LOG.info("mic on")
     return "mic on"
 
 
 @app.route("/mic_toggle")
 def mic_toggle():
     """hello"""
-    with open('./debug.txt', 'a') as dw:
-        dw.write(f"{time.time()} - mic toggle")
+    MIC_LOG.info("mic toggle")
 
     if os.path.exists('./mic.indicator'):
         mic_off() 
@@ -691,9 +927,40 @@ def mic_toggle():
 @app.route("/silence")
 def add_silence():
     """queue up silence"""
-    app.config["rbq"].add_silence()
+    app.config["rbq"].commands.submit("silence", app.config["rbq"].add_silence)
     return "add silence"
 
+@app.route("/search")
+def search():
+    """Search the library index"""
+    return jsonify(app.config["rbq"].library.search(request.args.get("q", "")))
+
+
+@app.route("/queue/<path:guid>")
+def queue_track(guid):
+    """Append a track to the play queue"""
+    rbq = app.config["rbq"]
+    if not rbq.library.track(guid):
+        return jsonify({"error": f"{guid} not in library"}), 404
+
+    def queue_command():
+        if not rbq.queue_track(guid):
+            raise RuntimeError(f"Failed to queue {guid}")
+
+    command = rbq.commands.submit(f"queue:{guid}", queue_command)
+    return jsonify(command), 202
+
+
+@app.route("/levels")
+def levels():
+    """Recent stream levels from the analyzer process"""
+    if not ANALYZER_PROCESS:
+        return jsonify({"error": "levels need ANALYZER_PROCESS=1"}), 404
+    # silent chunks are -inf dB, which is not valid JSON
+    return jsonify([level if math.isfinite(level) else None
+                    for level in app.config["rbq"].stream_levels])
+
+
 @app.route("/track_log")
 def track_log():
     track_log = ""
@@ -710,48 +977,96 @@ def update_status(rbq):
         if not rbq.ready:
             time.sleep(1)
             continue
-        try:
-            rbq.update_stats()
-        except Exception:
-            LOG.info(traceback.format_exc())
-        try:
-            rbq.update_now_playing()
-        except Exception:
-            LOG.info(traceback.format_exc())
+        if rbq.health["client"].allow():
+            try:
+                rbq.update_stats()
+                rbq.health["client"].success()
+            except Exception as exc:
+                rbq.health["client"].failure(exc)
+        if rbq.health["plex"].allow():
+            try:
+                rbq.update_now_playing()
+                rbq.health["plex"].success()
+            except Exception as exc:
+                rbq.health["plex"].failure(exc)
  
         time.sleep(0.5)
 
 
+def library_refresher(rbq):
+    """Build the library index and keep it up to date
+
+    Runs in the background so a restart doesn't wait on a full library load;
+    find_track falls back to searching Plex until the index is built. A
+    periodic full rebuild drops tracks deleted from the library.
+    """
+    while True:
+        try:
+            if time.time() - rbq.library.built_at > LIBRARY_REBUILD_INTERVAL:
+                rbq.library.build(rbq.server.library.section(LIBRARY_SECTION))
+            else:
+                rbq.library.refresh()
+        except Exception:
+            LOG.error("Failed to refresh library index")
+            LOG.debug(traceback.format_exc())
+        time.sleep(LIBRARY_REFRESH_INTERVAL)
+
+
 def get_stream(rbq):
     """Fetch the mp3 stream"""
     return requests.get(rbq.get('options').get('stream_url', ''), stream=True)
 
 
 def dead_air_detector(rbq):
-    """Detect dead air"""
-    last_audio_time = time.time() 
+    """Detect dead air and archive the stream from a single connection"""
+    tee = StreamTee(rbq.get_stream, on_disconnect=rbq.stream_disconnected)
+    tee.add_consumer("analyzer", rbq.analyze_stream_chunk)
+    if ENABLE_ARCHIVE:
+        tee.add_consumer("archive", ArchiveWriter(ARCHIVE_DIR), maxsize=1024)
+    rbq.stream_tee = tee
+    tee.run()
+
+
+def analyzer_supervisor(rbq):
+    """Run the stream analyzer in a child process and mirror its state"""
+    shared = SharedLevels(create=True)
+    atexit.register(shared.close, unlink=True)
+    archive_dir = ARCHIVE_DIR if ENABLE_ARCHIVE else None
+    breaker = CircuitBreaker("analyzer")
+    process = None
+    started = 0
+    transitions = 0
     while True:
-        radiostream = rbq.get_stream() 
-        for block in radiostream.iter_content(4096):
-            samps = 0
-            try:
-                samps = numpy.frombuffer(block, dtype = numpy.int16)
-            except ValueError:
-                rbq.stream_online = False
-                time.sleep(1)
-                radiostream = rbq.get_stream()
-                continue
-            rbq.stream_online = True
-            try:
-                rms = numpy.sqrt(numpy.mean(samps**2))
-            except Exception:
-                LOG.error(f"sampe debug: {samps}")
-                continue
-            db = 20*numpy.log10(rms)
-            if not math.isnan(db) and db < 30:
-                last_audio_time = time.time()
-            diff_time = time.time() - last_audio_time
-            rbq.time_since_stream_audio = int(diff_time)
+        time.sleep(0.25)
+        if not breaker.allow():
+            continue
+        try:
+            state = shared.read()
+            heartbeat = max(state["heartbeat"] if state else 0, started)
+            if process and process.is_alive() and \
+                    time.time() - heartbeat > ANALYZER_STALE_AFTER:
+                LOG.error("Stream analyzer stopped responding, restarting")
+                process.terminate()
+                process.join(5)
+            if not process or not process.is_alive():
+                if process:
+                    LOG.error(f"Stream analyzer exited with {process.exitcode}, "
+                              f"restarting")
+                    rbq.stream_online = False
+                started = time.time()
+                process = start_analyzer(shared, rbq.options.get("stream_url", ""),
+                                         archive_dir)
+            if state:
+                rbq.stream_online = bool(state["stream_online"])
+                rbq.last_audio_time = state["last_audio_time"] or rbq.last_audio_time
+                rbq.time_since_stream_audio = int(time.time() - rbq.last_audio_time)
+                rbq.stream_levels = state["levels"]
+                if state["transitions"] > transitions:
+                    rbq.latency.stream_transition(state["last_transition"])
+                transitions = state["transitions"]
+            breaker.success()
+        except Exception as exc:
+            breaker.failure(exc)
 
 
 def main():
@@ -760,22 +1075,38 @@ def main():
     rbq.tidbyt("onair")
     rbq.setup()
     # rbq.start_ah()
-    rbq.play()
+    if rbq.resumed and rbq.is_playing():
+        LOG.info("Client is still playing the resumed queue, not restarting playback")
+    else:
+        rbq.play()
 
+    threading.Thread(target=rbq.commands.run, daemon=True).start()
     threading.Thread(target=web, daemon=True, args=(rbq,)).start()
     threading.Thread(target=update_status, args=(rbq,), daemon=True).start()
-    threading.Thread(target=dead_air_detector, args=(rbq,), daemon=True).start()
+    if ANALYZER_PROCESS:
+        threading.Thread(target=analyzer_supervisor, args=(rbq,), daemon=True).start()
+    else:
+        threading.Thread(target=dead_air_detector, args=(rbq,), daemon=True).start()
+    threading.Thread(target=library_refresher, args=(rbq,), daemon=True).start()
     try:
         rbq.tidbyt("nowplaying")
         while True:
             logging.getLogger("plexapi").setLevel(logging.INFO)
+            if not rbq.health["plex"].allow():
+                time.sleep(1)
+                continue
             try:
-                rbq.sync_playlist()
-                rbq.refresh_play_queue_from_server() 
+                with rbq.play_queue_lock:
+                    rbq.sync_playlist()
+                    rbq.refresh_play_queue_from_server() 
+                if not rbq.ready:
+                    LOG.info(f"On air {time.time() - rbq.started_at:.2f}s after start "
+                             f"({'resumed' if rbq.resumed else 'fresh'} queue)")
                 rbq.ready = True
-            except Exception:
-                LOG.error(traceback.format_exc())
-                LOG.error("Exception from plex api, retrying...")
+                rbq.health["plex"].success()
+                rbq.checkpoint()
+            except Exception as exc:
+                rbq.health["plex"].failure(exc)
             time.sleep(1)
     except KeyboardInterrupt:
         LOG.info("Keyboard interrupt, shutting down")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Fan a single stream connection out to multiple consumers"""
+# pylint: disable=W1203,W0718
+
+import os
+import time
+import queue
+import logging
+import threading
+import traceback
+
+from datetime import datetime
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_SIZE = 4096
+CONSUMER_QUEUE_SIZE = 256
+ARCHIVE_MAX_SEGMENTS = 7 * 24
+
+
+class StreamConsumer:
+    """A stream consumer with its own bounded queue and worker thread"""
+
+    def __init__(self, name, handler, maxsize=CONSUMER_QUEUE_SIZE):
+        """init"""
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.thread = None
+
+    def start(self):
+        """Start the worker thread"""
+        if self.thread:
+            return
+        self.thread = threading.Thread(
+            target=self.run, name=f"tee-{self.name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, chunk):
+        """Queue a chunk without blocking, dropping it if the queue is full"""
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                LOG.warning("Stream consumer %s is behind, %d chunks dropped",
+                            self.name, self.dropped)
+
+    def run(self):
+        """Feed queued chunks to the handler"""
+        while True:
+            chunk = self.queue.get()
+            try:
+                self.handler(chunk)
+            except Exception:
+                LOG.error("Stream consumer %s failed", self.name)
+                LOG.debug("Stream consumer %s traceback", self.name, exc_info=True)
+
+
+class StreamTee:
+    """Read a stream once and hand each chunk to every consumer
+
+    Chunks are passed as read-only memoryviews over the received bytes, so
+    consumers share one buffer per chunk instead of each getting a copy.
+    """
+
+    def __init__(self, get_stream, chunk_size=CHUNK_SIZE, on_disconnect=None):
+        """init"""
+        self.get_stream = get_stream
+        self.chunk_size = chunk_size
+        self.on_disconnect = on_disconnect
+        self.consumers = []
+        self.running = False
+
+    def add_consumer(self, name, handler, maxsize=CONSUMER_QUEUE_SIZE):
+        """Register a handler that will be called with each chunk"""
+        consumer = StreamConsumer(name, handler, maxsize)
+        self.consumers.append(consumer)
+        if self.running:
+            consumer.start()
+        return consumer
+
+    def run(self):
+        """Read the stream forever, reconnecting on failure"""
+        self.running = True
+        for consumer in self.consumers:
+            consumer.start()
+        while True:
+            try:
+                radiostream = self.get_stream()
+                for block in radiostream.iter_content(self.chunk_size):
+                    if not block:
+                        continue
+                    chunk = memoryview(block)
+                    for consumer in self.consumers:
+                        consumer.offer(chunk)
+                LOG.info("Stream ended, reconnecting")
+            except Exception:
+                LOG.error("Stream connection failed, reconnecting")
+                LOG.debug(traceback.format_exc())
+            if self.on_disconnect:
+                self.on_disconnect()
+            time.sleep(1)
+
+
+class ArchiveWriter:
+    """Write stream chunks to files segmented by the hour
+
+    When a new segment starts, all but the newest ``max_segments`` segment
+    files are deleted.
+    """
+
+    def __init__(self, directory="archive", extension="mp3",
+                 max_segments=ARCHIVE_MAX_SEGMENTS):
+        """init"""
+        self.directory = directory
+        self.extension = extension
+        self.max_segments = max_segments
+        self.segment = None
+        self.archive_fh = None
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, chunk):
+        """Append a chunk to the current hour's file"""
+        segment = datetime.now().strftime("%Y%m%d_%H")
+        if segment != self.segment:
+            self.close()
+            path = os.path.join(self.directory, f"stream_{segment}.{self.extension}")
+            LOG.info(f"Archiving stream to {path}")
+            self.archive_fh = open(path, "ab")  # pylint: disable=R1732
+            self.segment = segment
+            self.prune()
+        self.archive_fh.write(chunk)
+
+    def prune(self):
+        """Delete the oldest segments beyond max_segments"""
+        if not self.max_segments:
+            return
+        segments = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("stream_") and name.endswith(f".{self.extension}"))
+        for name in segments[:-self.max_segments]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+                LOG.info("Removed old archive segment %s", name)
+            except OSError:
+                LOG.error("Failed to remove archive segment %s", name)
+
+    def close(self):
+        """Close the current segment"""
+        if self.archive_fh:
+            self.archive_fh.close()
+            self.archive_fh = None